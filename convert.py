@@ -6,21 +6,95 @@ This script mass converts audio files via FFmpeg.
 """
 
 import argparse
-from sys import exit
-from time import sleep
+import logging
+import os
+from sys import exit, stdin, stdout
 import subprocess
 import re
+from contextlib import suppress
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from enum import Enum, auto
+from functools import partial
 from pathlib import Path
+from typing import Iterator, NoReturn
 from shutil import which
 
-# Check if rich is installed.
-try:
-    from rich import print as rprint
-    from rich.prompt import Confirm
-    from rich.console import Console
-except ModuleNotFoundError as exc:
-    exc.add_note("rich is not installed. Please install it via 'pip install rich'.")
-    raise
+# rich is only needed when writing to a terminal.
+# Piped output, e.g. to a log file, is plain text and doesn't pay for importing rich.
+if stdout.isatty():
+    # Check if rich is installed.
+    try:
+        from rich import print as rprint
+        from rich.markup import escape
+        from rich.prompt import Confirm
+        from rich.console import Console
+        from rich.progress import MofNCompleteColumn, Progress
+    except ModuleNotFoundError as exc:
+        exc.add_note("rich is not installed. Please install it via 'pip install rich'.")
+        raise
+else:
+    # rich's markup tags, e.g. [bold red] or [/yellow].
+    # An escaped bracket, e.g. from a file name, is not a tag.
+    _MARKUP_RE: re.Pattern[str] = re.compile(r"(?<!\\)\[/?[a-z][a-z0-9_ ]*\]")
+
+    def escape(markup: str) -> str:
+        """Escapes the brackets in the text, so they aren't taken as markup."""
+        return markup.replace("[", "\\[")
+
+    def rprint(*objects: object) -> None:
+        """Prints the objects without rich's markup."""
+        print(*(_MARKUP_RE.sub("", str(obj)).replace("\\[", "[") for obj in objects))
+
+    class Console:
+        """Plain text stand-in for rich's Console."""
+
+        def log(self, *objects: object, **kwargs: object) -> None:
+            rprint(*objects)
+
+    class MofNCompleteColumn:
+        """Stand-in for rich's progress column, plain text has no columns."""
+
+    class Progress:
+        """Stand-in for rich's Progress, plain text has no progress bar."""
+
+        def __init__(self, *columns: object, **kwargs: object) -> None:
+            pass
+
+        def __enter__(self) -> "Progress":
+            return self
+
+        def __exit__(self, *exc_info: object) -> None:
+            pass
+
+        @staticmethod
+        def get_default_columns() -> tuple[object, ...]:
+            return ()
+
+        def add_task(self, description: str, **kwargs: object) -> int:
+            return 0
+
+        def update(self, task: int, **kwargs: object) -> None:
+            pass
+
+        def stop(self) -> None:
+            pass
+
+    class Confirm:
+        """Plain text stand-in for rich's Confirm prompt."""
+
+        @staticmethod
+        def ask(prompt: str, default: bool = False, **kwargs: object) -> bool:
+            # Ask again on anything else, like rich does, rather than taking it as a no.
+            while True:
+                try:
+                    answer = input(f"{_MARKUP_RE.sub('', prompt)} [y/n]: ").strip().lower()
+                except EOFError:
+                    return default
+                if not answer:
+                    return default
+                if answer in ("y", "n"):
+                    return answer == "y"
+                print("Please enter y or n")
 
 # Check if FFmpeg is available
 if not which("ffmpeg"):
@@ -28,6 +102,14 @@ if not which("ffmpeg"):
         "FFmpeg is not found. Please install it and add it to path."
     )
 
+# FFmpeg's errors are written to error.log.
+ERROR_LOG: Path = Path("error.log")
+
+# The file is opened once, on the first error, and shared by every conversion.
+err_log = logging.getLogger("convert.err")
+err_log.addHandler(logging.FileHandler(ERROR_LOG, encoding="utf-8", delay=True))
+err_log.propagate = False
+
 # argparse allows us to communicate the program via terminal.
 parser = argparse.ArgumentParser(
     description="Convert audio files via FFmpeg.",
@@ -60,6 +142,144 @@ parser.add_argument(
     nargs="?",
 )
 
+# Option for overwriting the existing outputs.
+parser.add_argument(
+    "-y",
+    "--overwrite",
+    help="Option to overwrite the existing output files instead of skipping them.",
+    action="store_true",
+)
+
+# Option for only listing the files to be converted.
+parser.add_argument(
+    "-p",
+    "--print",
+    help="Print the matching files and exit. "
+    "With the output extension, only the ones to be converted.",
+    action="store_true",
+)
+
+# Option for the number of files to be converted at the same time.
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    help="Number of FFmpeg processes to run in parallel.",
+    # Each FFmpeg process is busy on its own, don't flood the machine.
+    default=min(os.cpu_count() or 1, 8),
+)
+
+# Option for the number of threads each FFmpeg process uses.
+parser.add_argument(
+    "--ffmpeg-threads",
+    type=int,
+    help="Number of threads per FFmpeg process. 0 lets FFmpeg decide. "
+    "Defaults to 0 with a single job, otherwise the CPU cores are shared between the jobs.",
+    default=None,
+)
+
+# Option for converting several files with a single FFmpeg process.
+parser.add_argument(
+    "-b",
+    "--batch",
+    type=int,
+    help="Number of files converted by a single FFmpeg process. "
+    "Saves FFmpeg's startup time on many short files. Only used for audio outputs, "
+    "only the first audio stream of each file is kept.",
+    default=1,
+)
+
+# Option for using a hardware video encoder.
+parser.add_argument(
+    "--hwaccel",
+    help="Use a hardware H.264 encoder (NVENC, Quick Sync or VA-API) for video outputs when one is available, "
+    "otherwise libx264.",
+    action=argparse.BooleanOptionalAction,
+    default=True,
+)
+
+# Extensions may contain only letters, numbers and hyphens.
+_EXT_RE: re.Pattern[str] = re.compile(r"^[a-zA-Z0-9]+[a-zA-Z0-9-]*$")
+
+# The start of every FFmpeg command, passed as it is without a shell.
+# FFmpeg only reports errors, its output is only needed when the conversion fails.
+# Parallel FFmpeg processes must not read the terminal, nor take the answers meant for our prompts.
+FFMPEG_ARGV: tuple[str, ...] = (
+    "ffmpeg",
+    "-nostdin",
+    "-hide_banner",
+    "-loglevel",
+    "error",
+    "-nostats",
+)
+
+# Audio-only containers. Batches map only the audio, so only these outputs are batched.
+AUDIO_EXTENSIONS: frozenset[str] = frozenset(
+    {".aac", ".ac3", ".aiff", ".flac", ".m4a", ".mp3", ".oga", ".opus", ".wav", ".wma"}
+)
+
+# Video containers that can hold H.264, so a hardware encoder can be used for them.
+H264_EXTENSIONS: frozenset[str] = frozenset(
+    {".mp4", ".m4v", ".mov", ".mkv", ".ts", ".flv"}
+)
+
+# Hardware H.264 encoders in the order of preference, with their output options.
+HW_ENCODERS: dict[str, list[str]] = {
+    "h264_nvenc": ["-c:v", "h264_nvenc", "-preset", "p4", "-cq", "23"],
+    "h264_qsv": ["-c:v", "h264_qsv"],
+    "h264_vaapi": [
+        "-vaapi_device",
+        "/dev/dri/renderD128",
+        "-vf",
+        "format=nv12,hwupload",
+        "-c:v",
+        "h264_vaapi",
+    ],
+}
+
+# Consumer GPUs limit the number of concurrent encoding sessions, e.g. NVENC on GeForce cards.
+HW_MAX_JOBS: int = 2
+
+# The software H.264 encoder, used when there is no hardware encoder.
+# libx264's default medium preset is several times slower for a barely smaller file.
+SW_ENCODER: list[str] = ["-c:v", "libx264", "-preset", "veryfast"]
+
+# Outputs FFmpeg is currently writing to.
+# These are the leftovers to be deleted when KeyboardInterrupt raised.
+unfinished: set[Path] = set()
+
+
+class Result(Enum):
+    """The outcome of a single conversion."""
+
+    CONVERTED = auto()
+    FAILED = auto()
+    NOT_FOUND = auto()
+
+
+def clean_extension(ext: str) -> str:
+    """
+    Validates a file extension.
+
+    Args:
+        ext: The file extension, with or without the dot
+
+    Returns:
+        The extension in lowercase, starting with a dot.
+
+    Raises:
+        ValueError: If the extension is invalid.
+    """
+    ext = ext.strip().lstrip(".")
+
+    if not ext or not _EXT_RE.match(ext):
+        raise ValueError(
+            f"Invalid extension: '{ext}'. Extensions must contain only "
+            "letters, numbers, and hyphens, and cannot be empty."
+        )
+
+    return f".{ext.lower()}"
+
 
 def check_extensions(input_ext: str, output_ext: str) -> tuple[str, str]:
     """
@@ -75,24 +295,382 @@ def check_extensions(input_ext: str, output_ext: str) -> tuple[str, str]:
     Raises:
         ValueError: If either extension is invalid.
     """
+    return clean_extension(input_ext), clean_extension(output_ext)
 
-    def clean_ext(ext: str) -> str:
-        ext = ext.strip().lstrip(".")
 
-        if not ext or not re.match(r"^[a-zA-Z0-9]+[a-zA-Z0-9-]*$", ext):
-            raise ValueError(
-                f"Invalid extension: '{ext}'. Extensions must contain only "
-                "letters, numbers, and hyphens, and cannot be empty."
-            )
+def detect_video_encoder(output_ext: str, hwaccel: bool) -> list[str]:
+    """
+    Finds the H.264 encoder to use for the output extension.
+
+    A working hardware encoder is preferred, falling back to libx264.
+    An encoder being built into FFmpeg doesn't mean the hardware is there,
+    so each hardware candidate encodes a single test frame before being picked.
+
+    Args:
+        output_ext: The target extension, starting with a dot
+        hwaccel: Whether to look for a hardware encoder
+
+    Returns:
+        The FFmpeg output options of the encoder, empty if there is none
+        or the output isn't a video container taking H.264.
+    """
+    if output_ext not in H264_EXTENSIONS:
+        return []
+
+    encoders: str = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-encoders"],
+        # Only the list is needed, not the errors.
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    ).stdout
+
+    for encoder, options in HW_ENCODERS.items() if hwaccel else ():
+        if encoder not in encoders:
+            continue
+
+        test = subprocess.run(
+            [
+                *FFMPEG_ARGV,
+                "-f",
+                "lavfi",
+                "-i",
+                "color=size=256x256",
+                "-frames:v",
+                "1",
+                *options,
+                "-f",
+                "null",
+                "-",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if test.returncode == 0:
+            return options
+
+    if "libx264" in encoders:
+        return SW_ENCODER
 
-        return f".{ext.lower()}"
+    return []
 
-    return clean_ext(input_ext), clean_ext(output_ext)
+
+def ffmpeg_command(
+    files: list[Path],
+    outputs: list[Path],
+    threads: int,
+    overwrite: bool,
+    encoder: list[str],
+) -> list[str]:
+    """
+    Builds the FFmpeg command converting each file to its output.
+
+    Args:
+        files: The files to be converted
+        outputs: The output of each file, in the same order
+        threads: Number of threads FFmpeg uses, 0 for automatic
+        overwrite: Whether to overwrite the existing outputs
+        encoder: Output options selecting the video encoder, empty for FFmpeg's default.
+            Only used for a single file, batched outputs carry no video.
+
+    Returns:
+        The command as a list of arguments.
+    """
+    # The arguments are passed to FFmpeg as they are, no shell or quoting is involved.
+    command: list[str] = [
+        *FFMPEG_ARGV,
+        # -n is for exiting if output already exists, rather than asking for overwrite.
+        "-y" if overwrite else "-n",
+    ]
+
+    for file in files:
+        command += ["-i", str(file)]
+
+    # With several inputs, every output has to pick its own input's audio explicitly.
+    # Such outputs have no video, so the video encoder's options don't apply to them.
+    batched: bool = len(outputs) > 1
+
+    for index, output in enumerate(outputs):
+        if batched:
+            # Tags and chapters would otherwise all come from the first input.
+            command += [
+                "-map",
+                f"{index}:a:0",
+                "-map_metadata",
+                str(index),
+                "-map_chapters",
+                str(index),
+            ]
+        # 0 lets FFmpeg use every core, which is only desired when converting one file at a time.
+        command += ["-threads", str(threads)]
+        if not batched:
+            command += encoder
+        command.append(str(output))
+
+    return command
+
+
+def convert_one(
+    file: Path,
+    output_extension: str,
+    deleting_original: bool,
+    threads: int,
+    overwrite: bool,
+    encoder: list[str],
+) -> tuple[Result, str]:
+    """
+    Converts a single file via FFmpeg.
+
+    Args:
+        file: The file to be converted
+        output_extension: The target extension, starting with a dot
+        deleting_original: Whether to delete the file after conversion
+        threads: Number of threads FFmpeg uses, 0 for automatic
+        overwrite: Whether to overwrite the existing output
+        encoder: Output options selecting the video encoder, empty for FFmpeg's default
+
+    Returns:
+        The outcome of the conversion, with FFmpeg's error output if it failed.
+    """
+    # This will be ffmpeg's output.
+    output: Path = file.with_suffix(output_extension)
+
+    unfinished.add(output)
+    try:
+        subprocess.run(
+            ffmpeg_command([file], [output], threads, overwrite, encoder),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        # Logged by the caller, an interrupted conversion isn't an error.
+        return Result.FAILED, exc.stderr.decode(errors="replace")
+    except FileNotFoundError:
+        return Result.NOT_FOUND, ""
+    unfinished.discard(output)
+
+    if deleting_original:
+        # Delete the original file if the output file is created and the option is present.
+        with suppress(FileNotFoundError):
+            os.unlink(file)
+
+    return Result.CONVERTED, ""
+
+
+def convert_batch(
+    files: list[Path],
+    output_extension: str,
+    deleting_original: bool,
+    threads: int,
+    overwrite: bool,
+    encoder: list[str],
+) -> tuple[Result, str]:
+    """
+    Converts several files with a single FFmpeg process.
+
+    The outputs must not exist beforehand, unless they are overwritten.
+    When the batch fails, its outputs are left as they are for the caller to clean up.
+
+    Args:
+        files: The files to be converted
+        output_extension: The target extension, starting with a dot
+        deleting_original: Whether to delete the files after conversion
+        threads: Number of threads FFmpeg uses, 0 for automatic
+        overwrite: Whether to overwrite the existing outputs
+        encoder: Output options selecting the video encoder, empty for FFmpeg's default
+
+    Returns:
+        The outcome of the conversion, the same for every file.
+        A failed batch has no error output, its files are retried one by one.
+    """
+    if len(files) == 1:
+        return convert_one(
+            files[0], output_extension, deleting_original, threads, overwrite, encoder
+        )
+
+    outputs: list[Path] = [file.with_suffix(output_extension) for file in files]
+
+    unfinished.update(outputs)
+    try:
+        subprocess.run(
+            ffmpeg_command(files, outputs, threads, overwrite, encoder),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except subprocess.CalledProcessError:
+        # The files will be converted one by one, which gives the actual error.
+        return Result.FAILED, ""
+    except FileNotFoundError:
+        return Result.NOT_FOUND, ""
+    unfinished.difference_update(outputs)
+
+    if deleting_original:
+        for file in files:
+            with suppress(FileNotFoundError):
+                os.unlink(file)
+
+    return Result.CONVERTED, ""
+
+
+def iter_inputs(
+    location: Path,
+    input_ext: str,
+    existing: set[str] | None = None,
+    sizes: dict[Path, int] | None = None,
+) -> Iterator[Path]:
+    """
+    Yields the files to be converted in a directory.
+
+    scandir already knows the file types, so there is no extra stat per file.
+
+    Args:
+        location: The directory to look for the files
+        input_ext: The source file extension in lowercase, starting with a dot
+        existing: If given, filled with the normcase()'d names of every file
+            in the directory, once the iteration is finished
+        sizes: If given, filled with the size of each yielded file.
+            A file removed before its size is read is left out.
+
+    Yields:
+        Each file with the extension, matched case-insensitively.
+    """
+    with os.scandir(location) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if existing is not None:
+                existing.add(os.path.normcase(entry.name))
+            if not entry.name.lower().endswith(input_ext):
+                continue
+            file = Path(entry.path)
+            if sizes is not None:
+                # Free on Windows, scandir already has it.
+                try:
+                    sizes[file] = entry.stat().st_size
+                except FileNotFoundError:
+                    continue
+            yield file
+
+
+def select_files(
+    files: list[Path], output_ext: str, existing: set[str], overwrite: bool
+) -> tuple[list[Path], int, list[tuple[Path, Path]]]:
+    """
+    Picks the files to be converted among the found ones.
+
+    Inputs differing only in the case of the extension share an output, only the
+    first one by name is converted. Going by name makes the choice the same on every run.
+
+    Args:
+        files: The found files
+        output_ext: The target file extension, starting with a dot
+        existing: The normcase()'d names of every file in the directory
+        overwrite: Whether the existing outputs are overwritten
+
+    Returns:
+        The files to be converted sorted by name, the number of files
+        whose output already exists and the (skipped, converted) pairs sharing an output.
+    """
+    pending: list[Path] = []
+    skipped: int = 0
+    duplicates: list[tuple[Path, Path]] = []
+    taken: dict[str, Path] = {}
+    for file in sorted(files):
+        output_name: str = os.path.normcase(file.with_suffix(output_ext).name)
+        if output_name in taken:
+            duplicates.append((file, taken[output_name]))
+        elif not overwrite and output_name in existing:
+            skipped += 1
+        else:
+            taken[output_name] = file
+            pending.append(file)
+    return pending, skipped, duplicates
+
+
+def print_files(
+    input_ext: str,
+    location: Path,
+    output_ext: str | None = None,
+    overwrite: bool = False,
+) -> None:
+    """
+    Prints the names of the matching files sorted, one per line.
+
+    Args:
+        input_ext: The source file extension, starting with a dot
+        location: The directory to look for the files
+        output_ext: If given, only the files to be converted to it are printed
+        overwrite: Whether the existing outputs are overwritten
+    """
+    existing: set[str] = set()
+    files: list[Path] = sorted(iter_inputs(location, input_ext, existing))
+    if output_ext is not None:
+        files = select_files(files, output_ext, existing, overwrite)[0]
+    stdout.writelines(file.name + "\n" for file in files)
+
+
+def pause() -> None:
+    """
+    Keeps the console window open until enter is pressed.
+
+    Only on Windows when run interactively, e.g. by double-clicking the script.
+    Scripted or piped runs exit immediately.
+    """
+    if os.name == "nt" and stdin is not None and stdin.isatty() and stdout.isatty():
+        input("Press enter to close...")
+
+
+def handle_keyboard_interrupt(leftovers: set[Path]) -> NoReturn:
+    """
+    Asks whether to keep the unfinished outputs, deletes them if not, then exits.
+
+    Args:
+        leftovers: The outputs FFmpeg was writing to when interrupted
+    """
+    rprint("[red]Keyboard interrupt detected")
+    # Ask the user if they want to keep the unfinished files.
+    # By default, leftovers will be deleted.
+    if not Confirm.ask(
+        "[bright_green]Do you want to keep the unfinished files?",
+        choices=["y", "n"],
+        show_choices=True,
+        show_default=True,
+        default=False,
+    ):
+        rprint("[yellow]Deleting leftovers.")
+        # We know the exact outputs, so that the other files aren't affected.
+        for leftover in sorted(leftovers):
+            if leftover.is_file():
+                os.unlink(leftover)
+                rprint(f'[yellow]"{escape(leftover.name)}" deleted.')
+    rprint("Exiting.")
+    pause()
+    exit()
 
 
 def main() -> None:
     args = parser.parse_args()  # Parse the arguments.
 
+    if args.input is None:
+        parser.error("the input extension is required")
+
+    # Get the current directory where this script is located.
+    current_dir: Path = Path(__file__).absolute().parent
+
+    # Only list the files if the option is present, the output extension is optional.
+    if args.print:
+        if args.output is None:
+            print_files(clean_extension(args.input), current_dir)
+        else:
+            input_extension, output_extension = check_extensions(args.input, args.output)
+            print_files(input_extension, current_dir, output_extension, args.overwrite)
+        exit()
+
+    if args.output is None:
+        parser.error("the output extension is required")
+
     input_extension, output_extension = check_extensions(args.input, args.output)
 
     # Intialize the console.
@@ -101,11 +679,30 @@ def main() -> None:
     # Delete the original files if the option is present.
     deleting_original: bool = args.delete
 
-    # Get the current directory where this script is located.
-    current_dir: Path = Path(__file__).parent.resolve()
-
-    # -n is for exiting if output already exists, rather than asking for overwrite.
-    command: str = 'ffmpeg -n -i "{input}" "{output}"'
+    jobs: int = max(1, args.jobs)
+
+    # Look for the video encoder once, rather than per file.
+    encoder: list[str] = detect_video_encoder(output_extension, args.hwaccel)
+
+    # Hardware encoders take a limited number of sessions at once, the rest would fail.
+    if encoder and encoder != SW_ENCODER and jobs > HW_MAX_JOBS:
+        jobs = HW_MAX_JOBS
+        rprint(f"[yellow]Running {jobs} jobs at a time for the hardware encoder.")
+
+    # Share the cores between the parallel FFmpeg processes so they don't oversubscribe.
+    threads: int = args.ffmpeg_threads
+    if threads is None:
+        threads = 0 if jobs == 1 else max(1, (os.cpu_count() or 1) // jobs)
+
+    # Every batch is converted with the same settings.
+    convert = partial(
+        convert_batch,
+        output_extension=output_extension,
+        deleting_original=deleting_original,
+        threads=threads,
+        overwrite=args.overwrite,
+        encoder=encoder,
+    )
 
     rprint(
         "{} -> {} {}\nCurrent directory is: {}\n".format(
@@ -114,75 +711,134 @@ def main() -> None:
             "[yellow](keeping the original files)[/yellow]"
             if not deleting_original
             else "",
-            current_dir,
+            escape(str(current_dir)),
         )
     )
 
-    with console.status("Converting files...", spinner="dots") as status:
-        # Iterating through files one by one where this file is located.
-        for file in filter(
-            lambda f: f.is_file(), current_dir.glob(f"*{input_extension}")
-        ):
-            # This will be ffmpeg's output.
-            # It might be deleted as leftover when KeyboardInterrupt raised.
-            output: Path = file.with_suffix(output_extension)
-
-            # If the output file already exists, skip this file.
-            if output.exists():
-                status.update(f'[yellow]"{output.name}" already exists. Skipping.')
-                continue
+    if encoder:
+        rprint(f"[green]Encoding the video with {encoder[encoder.index('-c:v') + 1]}.\n")
 
-            # Emit a message for each file found.
-            status.update(f'Found "{file.name}", converting...')
+    # Collect the files where this file is located.
+    # The names of all files are kept to find the existing outputs without a stat per file.
+    existing: set[str] = set()
+    sizes: dict[Path, int] = {}
+    files: list[Path] = list(
+        iter_inputs(current_dir, input_extension, existing, sizes)
+    )
 
-            try:
-                subprocess.run(
-                    command.format(input=file.name, output=output.name),
-                    capture_output=True,
-                    check=True,
+    # The progress is only redrawn when a file is finished, there is no busy spinner.
+    with Progress(
+        *Progress.get_default_columns(),
+        MofNCompleteColumn(),
+        console=console,
+        auto_refresh=False,
+    ) as progress:
+        task = progress.add_task("Converting files...", total=None)
+
+        # If the output file already exists, skip this file.
+        # Checking here saves an FFmpeg process per converted file on a rerun.
+        # Only outputs that didn't exist before are ever deleted, see is_new() below.
+        pending_files, skipped, duplicates = select_files(
+            files, output_extension, existing, args.overwrite
+        )
+        for file, kept in duplicates:
+            console.log(
+                f'[yellow]Skipping "{escape(file.name)}", '
+                f'"{escape(kept.name)}" has the same output.'
+            )
+        if skipped:
+            console.log(f"[yellow]Skipping {skipped} file(s), their outputs already exist.")
+
+        # Start with the largest files so that a long conversion doesn't end up last.
+        pending_files.sort(key=sizes.__getitem__, reverse=True)
+        total: int = len(pending_files)
+        finished: int = 0
+        progress.update(task, total=total, refresh=True)
+
+        # Keep every worker busy even if there are only a few batches.
+        batch_size: int = max(1, min(args.batch, -(-len(pending_files) // jobs)))
+        # A batch maps only the audio, a video output would silently lose its video.
+        if output_extension not in AUDIO_EXTENSIONS:
+            if batch_size > 1:
+                console.log(
+                    f"[yellow]{output_extension} can hold video, converting the files one by one."
                 )
-
-                # Keep this outside of the if block to log whether the we are keeping the original files or not.
-                console.log("[magenta]Done! Looking for the next candidate file.")
-                # if output.exists() and deleting_original:
-                if deleting_original:
-                    # Delete the original file if the output file is created and the option is present.
-                    Path.unlink(file)
-                    console.log(
-                        f'[magenta]The original file "{file.name}" is deleted.',
-                        highlight=True,
-                    )
-            except subprocess.CalledProcessError as exc:
-                console.log(f'[bold red]Error converting "{file.name}"[/bold red]')
-                rprint(exc.stderr, file=open("error.log", "a"))
-                console.log("[yellow]Keeping the original file.")
-            except FileNotFoundError:
-                console.log("[bold red]The original file hasn't been found.[/bold red]")
-            except KeyboardInterrupt:
-                status.stop()
-                rprint("[red]Keyboard interrupt detected")
-                # Ask the user if they want to keep the unfinished files.
-                # By default, leftovers will be deleted.
-                if not Confirm.ask(
-                    "[bright_green]Do you want to keep the unfinished files?",
-                    choices=["y", "n"],
-                    show_choices=True,
-                    show_default=True,
-                    default=False,
-                ):
-                    rprint("[yellow]Deleting leftovers.")
-                    for leftover in filter(
-                        lambda f: f.is_file(), current_dir.glob(f"*{output_extension}")
-                    ):
-                        # We are looking for exact output so that the other files aren't affected.
-                        if leftover == output:
-                            Path.unlink(leftover)
-                            status.update(f'[yellow]{output.name}" deleted.')
-                rprint("Exiting.")
-                sleep(4)
-                exit()
+            batch_size = 1
+
+        def is_new(output: Path) -> bool:
+            """Whether the output didn't exist before, so it can be deleted when unfinished."""
+            return os.path.normcase(output.name) not in existing
+
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        try:
+            futures: dict[Future[tuple[Result, str]], list[Path]] = {
+                executor.submit(convert, batch): batch
+                for batch in (
+                    pending_files[i : i + batch_size]
+                    for i in range(0, len(pending_files), batch_size)
+                )
+            }
+            pending = set(futures)
+
+            # Log the files in the order they are finished.
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = futures.pop(future)
+                    result, error = future.result()
+
+                    if result is Result.FAILED and len(batch) > 1:
+                        # Remove what the batch has written and convert its files one by one.
+                        # Existing outputs being overwritten are the user's, they are kept.
+                        for file in batch:
+                            output = file.with_suffix(output_extension)
+                            if is_new(output):
+                                with suppress(FileNotFoundError):
+                                    os.unlink(output)
+                            unfinished.discard(output)
+                            retry = executor.submit(convert, [file])
+                            futures[retry] = [file]
+                            pending.add(retry)
+                        continue
+
+                    for file in batch:
+                        name: str = escape(file.name)
+                        finished += 1
+                        # Only an interrupted conversion leaves a leftover, not a failed one.
+                        unfinished.discard(file.with_suffix(output_extension))
+                        progress.update(task, advance=1, refresh=True)
+                        match result:
+                            case Result.CONVERTED:
+                                console.log(
+                                    f'[magenta][{finished}/{total}] Done converting "{name}".'
+                                )
+                                if deleting_original:
+                                    console.log(
+                                        f'[magenta]The original file "{name}" is deleted.',
+                                        highlight=True,
+                                    )
+                            case Result.FAILED:
+                                console.log(
+                                    f'[bold red]Error converting "{name}"[/bold red]'
+                                )
+                                err_log.error("Error converting %s: %s", file.name, error)
+                                console.log("[yellow]Keeping the original file.")
+                            case Result.NOT_FOUND:
+                                console.log(
+                                    "[bold red]The original file hasn't been found.[/bold red]"
+                                )
+        except KeyboardInterrupt:
+            progress.stop()
+            # Don't start the queued files, the running ones are interrupted as well.
+            # Wait for them to stop, so FFmpeg no longer holds the leftovers open.
+            # Whatever finished in the meantime is no longer in unfinished.
+            executor.shutdown(wait=True, cancel_futures=True)
+            handle_keyboard_interrupt(
+                {output for output in unfinished if is_new(output)}
+            )
+        executor.shutdown()
     rprint("[dodger_blue1]Everything is finished. Closing.")
-    sleep(3.5)
+    pause()
 
 
 if __name__ == "__main__":